@@ -0,0 +1,64 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+from responses import dumps_json
+
+# Append-only JSONL archive of AnalysisResult records (one per line); disabled when unset
+RESULTS_ARCHIVE_PATH = os.getenv("RESULTS_ARCHIVE_PATH", "")
+
+
+# Archive-only field: True when a risk variant (not the gene's default diplotype) set the
+# diplotype. rescore.py uses it to index only default-scored records under default|<gene>.
+EXACT_MATCH_FIELD = "_exact_match"
+
+
+def append_results(
+    results: List[Dict[str, Any]], exact_matches: List[bool], path: str = RESULTS_ARCHIVE_PATH
+) -> None:
+    """
+    Append results (with each one's exact-match flag) to the archive in a single
+    write so lines never interleave. Blocking file I/O — call via a threadpool.
+    """
+    if not path or not results:
+        return
+    data = b"".join(dumps_json({**r, EXACT_MATCH_FIELD: m}) + b"\n" for r, m in zip(results, exact_matches))
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def iter_archive(path: str, start: int = 0, end: int | None = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (byte_offset, record) for every complete line in [start, end).
+    A trailing line without a newline (write in progress) is not yielded.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n") or (end is not None and offset >= end):
+                break
+            if line.strip():
+                yield offset, json.loads(line)
+            offset += len(line)
+
+
+def read_record(f, offset: int) -> Dict[str, Any]:
+    """Read the record at `offset` from an archive opened in binary mode."""
+    f.seek(offset)
+    return json.loads(f.readline())
+
+
+def archive_end(path: str) -> int:
+    """Byte offset just past the last complete line."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                return pos + newline + 1
+    return 0
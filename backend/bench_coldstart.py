@@ -0,0 +1,94 @@
+"""
+Measure cold start: time from process spawn to the first successful response.
+
+Each run starts a fresh `uvicorn main:app` process, polls until the first
+request succeeds, records the elapsed time and kills the server. Lazy
+(default) and eager initialization are measured side by side.
+
+    python bench_coldstart.py --runs 10
+    python bench_coldstart.py --path /analyze/demo --runs 5
+
+Target: time-to-first-response under 1.0 s (median) from process start.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TARGET_SECONDS = 1.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, path: str) -> bool:
+    try:
+        if path == "/analyze/demo":
+            data = urllib.parse.urlencode({"drugs": "CODEINE,CLOPIDOGREL"}).encode()
+            urllib.request.urlopen(url + path, data=data, timeout=5).read()
+        else:
+            urllib.request.urlopen(url + path, timeout=5).read()
+        return True
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def measure_once(path: str, eager: bool, timeout: float = 30.0) -> float:
+    port = _free_port()
+    env = {**os.environ, "PHARMAGUARD_EAGER_INIT": "1" if eager else "0"}
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            if _request(url, path):
+                return time.perf_counter() - start
+            time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _import_time(eager: bool) -> float:
+    """In-process cost of `import main` in a fresh interpreter (no server)."""
+    env = {**os.environ, "PHARMAGUARD_EAGER_INIT": "1" if eager else "0"}
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--path", default="/health", choices=["/health", "/analyze/demo"])
+    args = ap.parse_args()
+
+    print(f"first request: {args.path}   runs: {args.runs}   target: < {TARGET_SECONDS:.1f}s median")
+    print(f"{'mode':<8}{'import ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for eager in (False, True):
+        imports = [_import_time(eager) for _ in range(min(args.runs, 5))]
+        samples = sorted(measure_once(args.path, eager) for _ in range(args.runs))
+        p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+        print(f"{'eager' if eager else 'lazy':<8}{statistics.median(imports) * 1e3:>12.1f}"
+              f"{statistics.median(samples) * 1e3:>10.1f}{p95 * 1e3:>10.1f}{samples[-1] * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
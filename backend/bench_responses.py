@@ -0,0 +1,159 @@
+"""
+Benchmark the /analyze response path end to end (build + serialize):
+the original dict + stdlib JSONResponse, the current main._build_result
+dicts + FastJSONResponse (orjson), and pydantic MultiDrugResult models
+(model_construct) + model_dump_json — plus bytes on the wire with
+gzip/brotli compression.
+
+    python bench_responses.py --patients 200 --repeat 20
+"""
+import argparse
+import time
+
+from starlette.responses import JSONResponse
+
+from main import DEMO_VARIANTS, SUPPORTED_DRUGS, _build_result, _overall_risk_summary
+from predictor import predict_drug_risk
+from llm_service import _generate_fallback_explanation
+from responses import FastJSONResponse, compress_body, brotli, orjson
+from schemas import (
+    AnalysisResult, MultiDrugResult, RiskAssessment, PharmacogenomicProfile,
+    ClinicalRecommendation, LLMExplanation, QualityMetrics,
+)
+
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def _predictions():
+    out = []
+    for drug in SUPPORTED_DRUGS:
+        prediction = predict_drug_risk(drug, DEMO_VARIANTS)
+        explanation = _generate_fallback_explanation(
+            drug, prediction["gene"], prediction["diplotype"],
+            prediction["phenotype_label"], prediction["risk_label"]
+        )
+        out.append((drug, prediction, explanation))
+    return out
+
+
+def build_dict_payload(patients: int, predictions, summary: str) -> list:
+    """The pre-schema shape: nested dicts assembled by hand."""
+    payload = []
+    for i in range(patients):
+        pid = f"PATIENT_{i:06d}"
+        results = [{
+            "patient_id": pid, "drug": drug, "timestamp": TIMESTAMP,
+            "risk_assessment": {
+                "risk_label": p["risk_label"], "confidence_score": p["confidence"], "severity": p["severity"]
+            },
+            "pharmacogenomic_profile": {
+                "primary_gene": p["gene"], "diplotype": p["diplotype"],
+                "phenotype": p["phenotype_label"], "detected_variants": p["gene_variants"]
+            },
+            "clinical_recommendation": {"action": p["action"], "notes": p["notes"]},
+            "llm_generated_explanation": explanation,
+            "quality_metrics": {"vcf_parsing_success": True},
+        } for drug, p, explanation in predictions]
+        payload.append({"patient_id": pid, "timestamp": TIMESTAMP, "results": results,
+                        "overall_risk_summary": summary})
+    return payload
+
+
+def build_current_payload(patients: int, predictions) -> list:
+    """What /analyze builds today: main._build_result dicts."""
+    payload = []
+    for i in range(patients):
+        pid = f"PATIENT_{i:06d}"
+        results = [_build_result(pid, drug, TIMESTAMP, p, explanation, True)
+                   for drug, p, explanation in predictions]
+        payload.append({"patient_id": pid, "timestamp": TIMESTAMP, "results": results,
+                        "overall_risk_summary": _overall_risk_summary(results)})
+    return payload
+
+
+def _risk_views(results) -> list:
+    """The two fields _overall_risk_summary reads, without dumping each model."""
+    return [{"risk_assessment": {"risk_label": r.risk_assessment.risk_label, "severity": r.risk_assessment.severity}}
+            for r in results]
+
+
+def build_model_payload(patients: int, predictions) -> list:
+    """Typed alternative: the same report as pydantic models (no validation)."""
+    payload = []
+    for i in range(patients):
+        pid = f"PATIENT_{i:06d}"
+        results = [AnalysisResult.model_construct(
+            patient_id=pid, drug=drug, timestamp=TIMESTAMP,
+            risk_assessment=RiskAssessment.model_construct(
+                risk_label=p["risk_label"], confidence_score=p["confidence"], severity=p["severity"]
+            ),
+            pharmacogenomic_profile=PharmacogenomicProfile.model_construct(
+                primary_gene=p["gene"], diplotype=p["diplotype"],
+                phenotype=p["phenotype_label"], detected_variants=p["gene_variants"]
+            ),
+            clinical_recommendation=ClinicalRecommendation.model_construct(action=p["action"], notes=p["notes"]),
+            llm_generated_explanation=LLMExplanation.model_construct(**explanation),
+            quality_metrics=QualityMetrics.model_construct(vcf_parsing_success=True),
+        ) for drug, p, explanation in predictions]
+        payload.append(MultiDrugResult.model_construct(
+            patient_id=pid, timestamp=TIMESTAMP, results=results,
+            overall_risk_summary=_overall_risk_summary(_risk_views(results))))
+    return payload
+
+
+def _time(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--patients", type=int, default=200, help="patients per cohort payload (6 drugs each)")
+    ap.add_argument("--repeat", type=int, default=20, help="timing repetitions (best-of)")
+    args = ap.parse_args()
+
+    predictions = _predictions()
+    summary = build_current_payload(1, predictions)[0]["overall_risk_summary"]
+    build_reps = max(1, args.repeat // 4)
+
+    paths = [
+        ("dict + JSONResponse (original)", lambda: build_dict_payload(args.patients, predictions, summary),
+         lambda r: JSONResponse(content=r).body),
+        ("dict + FastJSONResponse (current)", lambda: build_current_payload(args.patients, predictions),
+         lambda r: FastJSONResponse(content=r).body),
+        # pydantic-core writes JSON straight from the model, no intermediate dict
+        ("models + model_dump_json", lambda: build_model_payload(args.patients, predictions),
+         lambda r: r.model_dump_json().encode("utf-8")),
+    ]
+
+    print(f"payload: {args.patients} patients x {len(predictions)} drugs  (orjson={'yes' if orjson else 'no'})")
+    print(f"{'path':<36}{'build ms':>10}{'ser. ms':>10}{'total ms':>10}{'bytes':>12}")
+    totals = []
+    bodies = []
+    for name, build, render in paths:
+        build_s, payload = _time(build, build_reps)
+        # A cohort response is a list of per-patient reports; serialize each, as the endpoint would
+        ser_s, body = _time(lambda: b"".join(render(r) for r in payload), args.repeat)
+        totals.append(build_s + ser_s)
+        bodies.append(body)
+        print(f"{name:<36}{build_s * 1e3:>10.2f}{ser_s * 1e3:>10.2f}{(build_s + ser_s) * 1e3:>10.2f}{len(body):>12}")
+    print(f"speedup vs original (build + serialize): "
+          + ", ".join(f"{name.split(' (')[0]}: {totals[0] / t:.2f}x" for (name, _, _), t in zip(paths[1:], totals[1:])))
+    fast_body = bodies[1]
+
+    print(f"\n{'encoding':<34}{'ms':>10}{'bytes':>12}{'ratio':>8}")
+    for encoding in ("gzip", "br"):
+        if encoding == "br" and brotli is None:
+            print(f"{'br':<34}{'(brotli not installed)':>30}")
+            continue
+        comp_s, comp_body = _time(lambda: compress_body(fast_body, encoding), max(1, args.repeat // 4))
+        print(f"{encoding:<34}{comp_s * 1e3:>10.2f}{len(comp_body):>12}{len(fast_body) / len(comp_body):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Columnar export of cohort results for analytics (pandas / DuckDB / Spark).
+
+Streams a JSONL results archive (AnalysisResult or MultiDrugResult per line)
+into Parquet or Arrow IPC, one row per (patient, drug), flushing a row group
+every --row-group-size rows so memory stays bounded regardless of cohort size.
+
+    python export.py cohort.parquet --archive results.jsonl
+    python export.py cohort.arrow --archive results.jsonl --row-group-size 100000
+
+Requires pyarrow (pip install pyarrow).
+"""
+import argparse
+import os
+import sys
+from typing import Any, Dict, Iterator, List
+
+from archive import RESULTS_ARCHIVE_PATH, iter_archive
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional — only needed for this export tool
+    pa = None
+
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+COLUMNS = [
+    "patient_id", "drug", "timestamp", "gene", "diplotype", "phenotype",
+    "risk_label", "severity", "confidence_score", "vcf_parsing_success", "variant_ids",
+]
+
+
+def result_schema(dictionary_encode: bool = True) -> "pa.Schema":
+    # Low-cardinality text columns are dictionary-encoded for Parquet (pandas reads them as
+    # categoricals). The Arrow IPC file format cannot replace a dictionary between batches,
+    # so they are written as plain strings there.
+    category = pa.dictionary(pa.int32(), pa.string()) if dictionary_encode else pa.string()
+    return pa.schema([
+        ("patient_id", pa.string()),
+        ("drug", category),
+        ("timestamp", pa.string()),
+        ("gene", category),
+        ("diplotype", category),
+        ("phenotype", category),
+        ("risk_label", category),
+        ("severity", category),
+        ("confidence_score", pa.float64()),
+        ("vcf_parsing_success", pa.bool_()),
+        ("variant_ids", pa.list_(pa.string())),
+    ])
+
+
+def flatten_record(record: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield one flat row per AnalysisResult (MultiDrugResult lines expand to several)."""
+    if "results" in record:
+        for result in record["results"]:
+            yield from flatten_record(result)
+        return
+    profile = record["pharmacogenomic_profile"]
+    risk = record["risk_assessment"]
+    yield {
+        "patient_id": record["patient_id"],
+        "drug": record["drug"],
+        "timestamp": record["timestamp"],
+        "gene": profile["primary_gene"],
+        "diplotype": profile["diplotype"],
+        "phenotype": profile["phenotype"],
+        "risk_label": risk["risk_label"],
+        "severity": risk["severity"],
+        "confidence_score": risk["confidence_score"],
+        "vcf_parsing_success": record["quality_metrics"]["vcf_parsing_success"],
+        "variant_ids": [v.get("id", "") for v in profile["detected_variants"]],
+    }
+
+
+def _to_batch(columns: Dict[str, List[Any]], schema: "pa.Schema") -> "pa.RecordBatch":
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def export_results(
+    archive_path: str,
+    out_path: str,
+    fmt: str = "parquet",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """Stream the archive into a columnar file; returns the number of rows written."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for columnar export: pip install pyarrow")
+
+    schema = result_schema(dictionary_encode=fmt == "parquet")
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(out_path, schema, compression="zstd")
+        write = writer.write_batch
+    else:
+        sink = pa.OSFile(out_path, "wb")
+        writer = pa_ipc.new_file(sink, schema)
+        write = writer.write_batch
+
+    rows = 0
+    columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+    pending = 0
+    failed = True
+    try:
+        for _, record in iter_archive(archive_path):
+            for row in flatten_record(record):
+                for name in COLUMNS:
+                    columns[name].append(row[name])
+                pending += 1
+                if pending >= row_group_size:
+                    write(_to_batch(columns, schema))
+                    rows += pending
+                    columns = {name: [] for name in COLUMNS}
+                    pending = 0
+        if pending:
+            write(_to_batch(columns, schema))
+            rows += pending
+        failed = False
+    finally:
+        try:
+            writer.close()
+        finally:
+            if fmt != "parquet":
+                sink.close()
+            if failed:
+                # don't leave a truncated file that looks like a complete export
+                os.remove(out_path)
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("output", help="output .parquet / .arrow file")
+    ap.add_argument("--archive", default=RESULTS_ARCHIVE_PATH, help="JSONL results archive")
+    ap.add_argument("--format", choices=["parquet", "arrow"], default=None,
+                    help="output format (default: from the output file extension)")
+    ap.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                    help="rows buffered per row group / record batch")
+    args = ap.parse_args(argv)
+
+    if not args.archive:
+        ap.error("--archive is required when RESULTS_ARCHIVE_PATH is not set")
+    fmt = args.format or ("arrow" if args.output.endswith((".arrow", ".feather", ".ipc")) else "parquet")
+    try:
+        rows = export_results(args.archive, args.output, fmt, args.row_group_size)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"wrote {rows} rows to {args.output} ({fmt})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import gzip
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Local UCSC chain file mapping GRCh37 → GRCh38 (e.g. hg19ToHg38.over.chain.gz); disabled when unset
+LIFTOVER_CHAIN_PATH = os.getenv("LIFTOVER_CHAIN_PATH", "")
+
+CANONICAL_ASSEMBLY = "GRCh38"
+
+# Tokens of ##reference / ##assembly values, e.g. human_g1k_v37.fasta, Homo_sapiens_assembly38.fasta
+_ASSEMBLY_ALIASES = {
+    "grch37": "GRCh37", "hg19": "GRCh37", "b37": "GRCh37", "hs37d5": "GRCh37", "hs37": "GRCh37",
+    "v37": "GRCh37", "assembly37": "GRCh37",
+    "grch38": "GRCh38", "hg38": "GRCh38", "b38": "GRCh38", "hs38": "GRCh38", "hs38dh": "GRCh38",
+    "v38": "GRCh38", "assembly38": "GRCh38",
+}
+
+# chr1 length differs between builds, so ##contig lines identify the assembly even without a name
+_CHR1_LENGTHS = {249250621: "GRCh37", 248956422: "GRCh38"}
+
+# Pharmacogene loci on GRCh38 (1-based, inclusive), chromosome names without the "chr" prefix
+GENE_REGIONS_GRCH38: Dict[str, List[Tuple[int, int, str]]] = {
+    "1":  [(97077743, 97921049, "DPYD")],
+    "6":  [(18128311, 18155077, "TPMT")],
+    "10": [(94762681, 94855547, "CYP2C19"), (94938658, 94990091, "CYP2C9")],
+    "12": [(21130388, 21239796, "SLCO1B1")],
+    "22": [(42126499, 42130881, "CYP2D6")],
+}
+
+
+def normalize_chrom(chrom: str) -> str:
+    """'chr10' / 'Chr10' / '10' → '10'; 'chrM' / 'MT' → 'MT'."""
+    name = chrom[3:] if chrom[:3].lower() == "chr" else chrom
+    if name.upper() in ("X", "Y", "M", "MT"):
+        name = name.upper()
+    return "MT" if name == "M" else name
+
+
+def detect_assembly(header_lines: List[str]) -> Optional[str]:
+    """Guess the reference build from ##reference / ##assembly / ##contig header lines."""
+    for line in header_lines:
+        if line.startswith(("##reference", "##assembly")) or "assembly=" in line:
+            for token in re.split(r"[^A-Za-z0-9]+", line.lower()):
+                if token in _ASSEMBLY_ALIASES:
+                    return _ASSEMBLY_ALIASES[token]
+    for line in header_lines:
+        if line.startswith("##contig"):
+            match = re.search(r"ID=(?:chr)?1,.*?length=(\d+)", line) or \
+                re.search(r"length=(\d+),.*?ID=(?:chr)?1[,>]", line)
+            if match and int(match.group(1)) in _CHR1_LENGTHS:
+                return _CHR1_LENGTHS[int(match.group(1))]
+    return None
+
+
+class LiftoverError(Exception):
+    """The configured chain file is missing, unreadable or malformed."""
+
+
+class LiftoverIndex:
+    """
+    In-memory liftover built from a UCSC chain file: per source chromosome,
+    ungapped alignment blocks as parallel sorted arrays (start, end, target
+    offset) plus the target chromosome/strand, searched with bisect.
+    """
+
+    def __init__(self):
+        # chrom → (starts, ends, target_starts, target_chroms, target_negative_strand, target_sizes)
+        self._blocks: Dict[str, Tuple[array, array, array, List[str], List[bool], array]] = {}
+
+    @classmethod
+    def from_chain_file(cls, path: str) -> "LiftoverIndex":
+        """Parse a (optionally gzipped) chain file; raises ValueError/OSError if it is malformed."""
+        opener = gzip.open if path.endswith(".gz") else open
+        raw: Dict[str, List[Tuple[int, int, int, str, bool, int]]] = {}
+        with opener(path, "rt") as f:
+            t_chrom = q_chrom = ""
+            t_pos = q_pos = q_size = 0
+            q_negative = False
+            in_chain = False
+            for line_no, line in enumerate(f, 1):
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == "chain":
+                    # chain score tName tSize tStrand tStart tEnd qName qSize qStrand qStart qEnd id
+                    if in_chain or len(fields) < 12:
+                        raise ValueError(f"line {line_no}: malformed or unterminated chain header")
+                    t_chrom = normalize_chrom(fields[2])
+                    t_pos = int(fields[5])
+                    q_chrom = normalize_chrom(fields[7])
+                    q_size = int(fields[8])
+                    q_negative = fields[9] == "-"
+                    q_pos = int(fields[10])
+                    in_chain = True
+                    continue
+                if not in_chain or len(fields) not in (1, 3):
+                    raise ValueError(f"line {line_no}: alignment block outside a chain or with bad field count")
+                size = int(fields[0])
+                raw.setdefault(t_chrom, []).append((t_pos, t_pos + size, q_pos, q_chrom, q_negative, q_size))
+                if len(fields) == 3:
+                    t_pos += size + int(fields[1])
+                    q_pos += size + int(fields[2])
+                else:
+                    in_chain = False  # a single-field line ends the chain
+            if in_chain:
+                raise ValueError("file ends inside a chain (truncated?)")
+        if not raw:
+            raise ValueError("no alignment blocks found")
+
+        index = cls()
+        for chrom, blocks in raw.items():
+            blocks.sort()
+            index._blocks[chrom] = (
+                array("q", (b[0] for b in blocks)),
+                array("q", (b[1] for b in blocks)),
+                array("q", (b[2] for b in blocks)),
+                [b[3] for b in blocks],
+                [b[4] for b in blocks],
+                array("q", (b[5] for b in blocks)),
+            )
+        return index
+
+    def lift(self, chrom: str, pos: int) -> Optional[Tuple[str, int]]:
+        """Map a 1-based position to the target build; None if it falls in a gap."""
+        blocks = self._blocks.get(normalize_chrom(chrom))
+        if blocks is None:
+            return None
+        starts, ends, q_starts, q_chroms, q_negative, q_sizes = blocks
+        zero_based = pos - 1
+        i = bisect_right(starts, zero_based) - 1
+        if i < 0 or zero_based >= ends[i]:
+            return None
+        q = q_starts[i] + (zero_based - starts[i])
+        if q_negative[i]:
+            # chain coordinates on the minus strand count from the end of the target chromosome
+            q = q_sizes[i] - q - 1
+        return q_chroms[i], q + 1
+
+
+# Loaded indexes and load failures, by path. A failure is kept with the file's
+# (mtime, size) so a bad chain file is not re-parsed on every GRCh37 request, but
+# is retried once the file is fixed or replaced on disk.
+_INDEXES: Dict[str, LiftoverIndex] = {}
+_LOAD_ERRORS: Dict[str, Tuple[Optional[Tuple[int, int]], LiftoverError]] = {}
+# Concurrent first requests wait for one load instead of each parsing the chain file
+_LOAD_LOCK = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_liftover_index(path: Optional[str] = None) -> Optional[LiftoverIndex]:
+    """
+    Return the index for `path` (default LIFTOVER_CHAIN_PATH; None when no chain
+    file is configured). Raises LiftoverError if the file cannot be loaded.
+    Parsing a full chain file takes a while, so call this at startup or off the event loop.
+    """
+    path = LIFTOVER_CHAIN_PATH if path is None else path
+    if not path:
+        return None
+    index = _INDEXES.get(path)
+    if index is not None:
+        return index
+    with _LOAD_LOCK:
+        if path in _INDEXES:
+            return _INDEXES[path]
+        signature = _file_signature(path)
+        if path in _LOAD_ERRORS and _LOAD_ERRORS[path][0] == signature:
+            raise _LOAD_ERRORS[path][1]
+        try:
+            index = LiftoverIndex.from_chain_file(path)
+        except (OSError, EOFError, ValueError, IndexError) as e:
+            error = LiftoverError(f"cannot load liftover chain file {path}: {e}")
+            _LOAD_ERRORS[path] = (signature, error)
+            raise error from e
+        _LOAD_ERRORS.pop(path, None)
+        _INDEXES[path] = index
+        return index
+
+
+def liftover_ready(path: Optional[str] = None) -> bool:
+    """True when no chain is configured or it is already loaded (no file I/O needed)."""
+    path = LIFTOVER_CHAIN_PATH if path is None else path
+    return not path or path in _INDEXES
+
+
+def to_grch38(
+    chrom: str, pos: int, assembly: Optional[str], index: Optional[LiftoverIndex]
+) -> Optional[Tuple[str, int]]:
+    """
+    Normalize a variant coordinate to GRCh38. GRCh37 input is lifted through
+    `index`; an unknown build (or GRCh37 without an index) returns None, since
+    guessing the build would attach unrelated variants to pharmacogene loci.
+    """
+    chrom = normalize_chrom(chrom)
+    if assembly == CANONICAL_ASSEMBLY:
+        return chrom, pos
+    if assembly == "GRCh37" and index is not None:
+        return index.lift(chrom, pos)
+    return None
+
+
+def gene_at(chrom: str, pos: int) -> str:
+    """Return the pharmacogene whose GRCh38 locus contains chrom:pos, or ''."""
+    for start, end, gene in GENE_REGIONS_GRCH38.get(chrom, ()):
+        if start <= pos <= end:
+            return gene
+    return ""
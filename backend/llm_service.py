@@ -1,11 +1,33 @@
 import os
 import json
-import httpx
+import asyncio
 from typing import Dict, Any
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
+# Overridable so load tests can point at a local mock provider (see mock_llm.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+
+# Shared provider client, created on first use so cold start does not pay the httpx import
+_CLIENT = None
+
+
+def get_client():
+    global _CLIENT
+    if _CLIENT is None:
+        import httpx
+        _CLIENT = httpx.AsyncClient(timeout=30)
+    return _CLIENT
+
+
+async def close_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
 LLM_PROMPT_TEMPLATE = """You are a clinical pharmacogenomics expert AI assistant.
 
 Analyze the following pharmacogenomic data and provide a structured clinical explanation.
@@ -47,6 +69,49 @@ async def get_llm_explanation(
         severity=severity
     )
     
+    return await _singleflight(
+        prompt,
+        lambda: _resolve_explanation(prompt, drug, gene, diplotype, phenotype, risk_label)
+    )
+
+
+# In-flight provider calls keyed by prompt; concurrent identical prompts await the same task
+_INFLIGHT: Dict[str, "asyncio.Task[Dict[str, str]]"] = {}
+
+LLM_STATS = {
+    "requests": 0,    # get_llm_explanation calls
+    "executed": 0,    # calls that actually went to the providers/fallback
+    "coalesced": 0,   # calls that joined an in-flight identical request
+}
+
+
+async def _singleflight(key: str, fn) -> Dict[str, str]:
+    LLM_STATS["requests"] += 1
+    task = _INFLIGHT.get(key)
+    if task is None:
+        LLM_STATS["executed"] += 1
+        task = asyncio.ensure_future(fn())
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+    else:
+        LLM_STATS["coalesced"] += 1
+
+    # shield: a cancelled caller (e.g. client disconnect) must not cancel the shared call
+    result = await asyncio.shield(task)
+    return dict(result)
+
+
+def _finish_inflight(key: str, task: asyncio.Task) -> None:
+    if _INFLIGHT.get(key) is task:
+        del _INFLIGHT[key]
+    # mark the exception retrieved in case every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+async def _resolve_explanation(
+    prompt: str, drug: str, gene: str, diplotype: str, phenotype: str, risk_label: str
+) -> Dict[str, str]:
     # Try OpenAI first
     if OPENAI_API_KEY:
         result = await _call_openai(prompt)
@@ -65,46 +130,52 @@ async def get_llm_explanation(
 
 async def _call_openai(prompt: str) -> Dict[str, str] | None:
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3,
-                    "max_tokens": 500
-                }
-            )
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            return json.loads(content)
+        response = await get_client().post(
+            f"{OPENAI_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.3,
+                "max_tokens": 500
+            }
+        )
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        return _validate_explanation(json.loads(content))
     except Exception:
         return None
 
 
 async def _call_gemini(prompt: str) -> Dict[str, str] | None:
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}",
-                json={
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {"temperature": 0.3, "maxOutputTokens": 500}
-                }
-            )
-            data = response.json()
-            content = data["candidates"][0]["content"]["parts"][0]["text"]
-            # Strip markdown if present
-            content = content.strip().lstrip("```json").rstrip("```").strip()
-            return json.loads(content)
+        response = await get_client().post(
+            f"{GEMINI_BASE_URL}/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}",
+            json={
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"temperature": 0.3, "maxOutputTokens": 500}
+            }
+        )
+        data = response.json()
+        content = data["candidates"][0]["content"]["parts"][0]["text"]
+        # Strip markdown if present
+        content = content.strip().lstrip("```json").rstrip("```").strip()
+        return _validate_explanation(json.loads(content))
     except Exception:
         return None
 
 
+def _validate_explanation(explanation: Any) -> Dict[str, str] | None:
+    """Accept provider output only if it has every field the LLMExplanation schema requires."""
+    required = ("summary", "mechanism", "clinical_impact")
+    if not isinstance(explanation, dict) or not all(isinstance(explanation.get(k), str) for k in required):
+        return None
+    return {k: explanation[k] for k in required}
+
+
 def _generate_fallback_explanation(
     drug: str, gene: str, diplotype: str, phenotype: str, risk_label: str
 ) -> Dict[str, str]:
@@ -0,0 +1,166 @@
+"""
+Async load generator for POST /analyze.
+
+Drives the API with a mix of synthetic VCF sizes and drug panels at
+increasing concurrency and reports throughput, p50/p95/p99 latency and an
+error breakdown per level. Pair it with mock_llm.py so the LLM path is
+exercised without paid provider calls:
+
+    python mock_llm.py --port 9000 --latency-ms 800 &
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app --port 8000 &
+    python loadtest.py --url http://127.0.0.1:8000 --mock-url http://127.0.0.1:9000 --concurrency 1,8,32,128
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import httpx
+
+# Pharmacogene variants (GRCh37 coordinates); GENE/RSID INFO tags make gene assignment build-independent
+PGX_VARIANTS = [
+    ("22", 42526694, "rs3892097", "C", "T", "CYP2D6"),
+    ("22", 42524947, "rs1065852", "C", "T", "CYP2D6"),
+    ("10", 96521657, "rs4244285", "G", "A", "CYP2C19"),
+    ("10", 96522463, "rs4986893", "G", "A", "CYP2C19"),
+    ("10", 96741053, "rs1057910", "A", "C", "CYP2C9"),
+    ("10", 96702047, "rs1799853", "C", "T", "CYP2C9"),
+    ("12", 21331549, "rs4149056", "T", "C", "SLCO1B1"),
+    ("6", 18130918, "rs1800460", "G", "A", "TPMT"),
+    ("1", 97547947, "rs3918290", "C", "T", "DPYD"),
+]
+
+# Number of non-pharmacogene background records per VCF
+VCF_SIZES = {"small": 10, "medium": 2_000, "large": 40_000}
+
+DRUG_PANELS = {
+    "single": ["CLOPIDOGREL"],
+    "cardio": ["CLOPIDOGREL", "WARFARIN", "SIMVASTATIN"],
+    "full": ["CODEINE", "CLOPIDOGREL", "WARFARIN", "SIMVASTATIN", "AZATHIOPRINE", "FLUOROURACIL"],
+}
+
+
+def make_vcf(background: int, rng: random.Random) -> bytes:
+    lines = [
+        "##fileformat=VCFv4.2",
+        "##reference=GRCh37",
+        "##INFO=<ID=GENE,Number=1,Type=String,Description=\"Gene name\">",
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tSAMPLE",
+    ]
+    for chrom, pos, rsid, ref, alt, gene in rng.sample(PGX_VARIANTS, rng.randint(1, len(PGX_VARIANTS))):
+        lines.append(f"{chrom}\t{pos}\t{rsid}\t{ref}\t{alt}\t60\tPASS\tGENE={gene};RSID={rsid}\tGT\t0/1")
+    for _ in range(background):
+        chrom = str(rng.randint(2, 21))
+        lines.append(f"{chrom}\t{rng.randint(1_000_000, 100_000_000)}\t.\tA\tG\t50\tPASS\tDP={rng.randint(10, 99)}\tGT\t0/1")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def build_corpus(seed: int, per_combo: int = 4) -> List[Tuple[str, str, bytes]]:
+    """Pre-generate (size, panel, vcf) combinations so generation is not part of the measurement."""
+    rng = random.Random(seed)
+    corpus = []
+    for size, background in VCF_SIZES.items():
+        for panel in DRUG_PANELS:
+            for _ in range(per_combo):
+                corpus.append((size, panel, make_vcf(background, rng)))
+    return corpus
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def run_level(
+    client: httpx.AsyncClient, url: str, corpus, concurrency: int, total: int, rng: random.Random
+) -> Dict:
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    by_size: Dict[str, List[float]] = {size: [] for size in VCF_SIZES}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            size, panel, vcf = rng.choice(corpus)
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{url}/analyze",
+                    files={"file": ("load.vcf", vcf, "text/plain")},
+                    data={"drugs": ",".join(DRUG_PANELS[panel])},
+                )
+                outcome = str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - start
+            outcomes[outcome] += 1
+            if outcome == "200":
+                latencies.append(elapsed)
+                by_size[size].append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "outcomes": dict(outcomes),
+        "p50_by_size": {s: statistics.median(v) for s, v in by_size.items() if v},
+    }
+
+
+async def main_async(args) -> None:
+    corpus = build_corpus(args.seed)
+    rng = random.Random(args.seed)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        health = (await client.get(f"{args.url}/health")).json()
+        print(f"target: {args.url}   llm_available: {health.get('llm_available')}   "
+              f"corpus: {len(corpus)} VCFs ({', '.join(f'{k}={v}' for k, v in VCF_SIZES.items())} background rows)")
+        print(f"{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  {'p50 by size (ms)':<34}outcomes")
+        for concurrency in levels:
+            r = await run_level(client, args.url, corpus, concurrency, args.requests, rng)
+            sizes = " ".join(f"{s}={v * 1e3:.0f}" for s, v in r["p50_by_size"].items())
+            print(f"{r['concurrency']:>5}{r['throughput']:>9.1f}{r['p50'] * 1e3:>9.0f}{r['p95'] * 1e3:>9.0f}"
+                  f"{r['p99'] * 1e3:>9.0f}  {sizes:<34}{r['outcomes']}")
+
+        stats = (await client.get(f"{args.url}/health")).json().get("llm_stats")
+        if stats:
+            print(f"llm_stats: {stats}")
+        if args.mock_url:
+            # Provider failures surface as fallback explanations (HTTP 200), so report them from the mock
+            mock = (await client.get(f"{args.mock_url}/stats")).json()
+            print(f"mock provider: requests={mock['requests']} ok={mock['ok']} "
+                  f"errors={mock['errors']} rate_limited={mock['rate_limited']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", default="1,4,16,64", help="comma-separated concurrency levels")
+    ap.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--mock-url", help="mock_llm.py base URL, to include provider-side error counts")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,50 @@
-from dotenv import load_dotenv
-load_dotenv()
-
 import os
+
+# Serverless platforms inject env vars directly; only import python-dotenv when there is a .env file
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(_ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
+
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 
+from archive import RESULTS_ARCHIVE_PATH, append_results
+from liftover import LiftoverError, liftover_ready, load_liftover_index
 from parser import parse_vcf_content, is_valid_vcf
 from predictor import predict_drug_risk, DRUG_GENE_MAP
-from llm_service import get_llm_explanation
+from llm_service import get_llm_explanation, get_client, close_client, LLM_STATS
+from profiling import RequestProfile, request_profile
+from responses import FastJSONResponse, add_compression
 from schemas import AnalysisResult, MultiDrugResult
 
+# Lazy by default: provider clients and optional modules load on first use.
+# PHARMAGUARD_EAGER_INIT=1 builds them at startup instead (long-lived servers).
+EAGER_INIT = os.getenv("PHARMAGUARD_EAGER_INIT", "").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EAGER_INIT:
+        get_client()
+        # Raises LiftoverError here, at startup, if LIFTOVER_CHAIN_PATH is bad
+        load_liftover_index()
+    yield
+    await close_client()
+
+
 app = FastAPI(
     title="PharmaGuard API",
     description="Pharmacogenomic Risk Prediction System",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -28,10 +54,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# No-op unless RESPONSE_COMPRESSION is set (gzip / br / auto)
+add_compression(app)
 
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 SUPPORTED_DRUGS = list(DRUG_GENE_MAP.keys())
 
+# Simulate some interesting variants for the demo endpoint
+DEMO_VARIANTS = [
+    {"chrom": "22", "pos": "42526694", "id": "rs3892097", "ref": "C", "alt": "T",
+     "gene": "CYP2D6", "star_allele": "*4", "info": {"GENE": "CYP2D6", "RSID": "rs3892097"}},
+    {"chrom": "10", "pos": "96521657", "id": "rs4244285", "ref": "G", "alt": "A",
+     "gene": "CYP2C19", "star_allele": "*2", "info": {"GENE": "CYP2C19", "RSID": "rs4244285"}},
+    {"chrom": "10", "pos": "96741053", "id": "rs1057910", "ref": "A", "alt": "C",
+     "gene": "CYP2C9", "star_allele": "*3", "info": {"GENE": "CYP2C9", "RSID": "rs1057910"}},
+    {"chrom": "12", "pos": "21331549", "id": "rs4149056", "ref": "T", "alt": "C",
+     "gene": "SLCO1B1", "star_allele": "*5", "info": {"GENE": "SLCO1B1", "RSID": "rs4149056"}},
+]
+
 
 @app.get("/health")
 async def health_check():
@@ -42,15 +82,138 @@ async def health_check():
         "supported_drugs": SUPPORTED_DRUGS,
         "supported_genes": list(set(DRUG_GENE_MAP.values())),
         "llm_available": bool(os.environ.get("OPENAI_API_KEY") or os.environ.get("GEMINI_API_KEY")),
+        "llm_stats": LLM_STATS,
+    }
+
+
+def _parse_drug_list(drugs: str) -> List[str]:
+    drug_list = [d.strip().upper() for d in drugs.split(",") if d.strip()]
+    invalid_drugs = [d for d in drug_list if d not in SUPPORTED_DRUGS]
+    if invalid_drugs:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported drugs: {invalid_drugs}. Supported: {SUPPORTED_DRUGS}"
+        )
+    return drug_list
+
+
+def _overall_risk_summary(results: List[dict]) -> str:
+    risk_levels = [r["risk_assessment"]["risk_label"] for r in results]
+    if "Toxic" in risk_levels or any(r["risk_assessment"]["severity"] == "critical" for r in results):
+        return "HIGH RISK: Critical drug-gene interactions detected. Immediate clinical review required."
+    if "Adjust Dosage" in risk_levels or "Ineffective" in risk_levels:
+        return "MODERATE RISK: Dose adjustments or drug substitutions recommended."
+    return "LOW RISK: No significant drug-gene interactions detected. Standard therapy appropriate."
+
+
+def _build_result(
+    pid: str,
+    drug: str,
+    timestamp: str,
+    prediction: dict,
+    llm_explanation: dict,
+    vcf_valid: bool
+) -> dict:
+    """
+    One AnalysisResult, as a plain dict. Inputs are trusted (predictor output,
+    LLM text already checked by llm_service), so the response is rendered
+    straight from dicts; instantiating the pydantic models per result costs
+    more than the faster serializer saves (see bench_responses.py).
+    test_responses.py validates the output against the schemas.
+    """
+    return {
+        "patient_id": pid,
+        "drug": drug,
+        "timestamp": timestamp,
+        "risk_assessment": {
+            "risk_label": prediction["risk_label"],
+            "confidence_score": prediction["confidence"],
+            "severity": prediction["severity"]
+        },
+        "pharmacogenomic_profile": {
+            "primary_gene": prediction["gene"],
+            "diplotype": prediction["diplotype"],
+            "phenotype": prediction["phenotype_label"],
+            "detected_variants": prediction["gene_variants"]
+        },
+        "clinical_recommendation": {
+            "action": prediction["action"],
+            "notes": prediction["notes"]
+        },
+        "llm_generated_explanation": llm_explanation,
+        "quality_metrics": {
+            "vcf_parsing_success": vcf_valid
+        }
+    }
+
+
+async def _analyze_variants(
+    pid: str,
+    drug_list: List[str],
+    variants: List[dict],
+    vcf_valid: bool,
+    profile: RequestProfile
+) -> Tuple[dict, List[bool]]:
+    """
+    Run prediction + LLM explanation for each drug. Returns a MultiDrugResult-shaped
+    report and, per result, whether a risk variant matched exactly (for the archive).
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    results = []
+    exact_matches = []
+
+    for drug in drug_list:
+        with profile.stage(f"predict_drug_risk:{drug}"):
+            prediction = predict_drug_risk(drug, variants)
+
+        # Get LLM explanation
+        variant_ids = [v.get("id", "unknown") for v in prediction["gene_variants"]]
+        variant_id_str = ", ".join(variant_ids) if variant_ids else "No variant detected"
+
+        with profile.stage(f"llm_explanation:{drug}", profile=False):
+            llm_explanation = await get_llm_explanation(
+                drug=drug,
+                gene=prediction["gene"],
+                variant_id=variant_id_str,
+                diplotype=prediction["diplotype"],
+                phenotype=prediction["phenotype_label"],
+                risk_label=prediction["risk_label"],
+                severity=prediction["severity"]
+            )
+
+        results.append(_build_result(pid, drug, timestamp, prediction, llm_explanation, vcf_valid))
+        exact_matches.append(prediction["_exact_match"])
+
+    report = {
+        "patient_id": pid,
+        "timestamp": timestamp,
+        "results": results,
+        "overall_risk_summary": _overall_risk_summary(results)
     }
+    return report, exact_matches
+
+
+def _respond(content, profile: RequestProfile) -> FastJSONResponse:
+    with profile.stage("serialize_response"):
+        response = FastJSONResponse(content=content)
+    profile_id = profile.dump()
+    if profile_id:
+        response.headers["X-PharmaGuard-Profile-Id"] = profile_id
+    return response
 
 
-@app.post("/analyze")
+# Handlers return pre-rendered responses; response_model documents the schema in OpenAPI
+# (test_responses.py checks that the output validates against it)
+@app.post("/analyze", response_model=Union[AnalysisResult, MultiDrugResult])
 async def analyze(
+    request: Request,
     file: UploadFile = File(...),
     drugs: str = Form(...),  # comma-separated drug names
     patient_id: Optional[str] = Form(None)
 ):
+    # Opt-in profiling (PROFILING_ENABLED + admin token + X-PharmaGuard-Profile header)
+    profile = request_profile(request)
+
     # Validate file
     content = await file.read()
     if len(content) > MAX_FILE_SIZE:
@@ -59,152 +222,46 @@ async def analyze(
     if not file.filename.endswith(".vcf"):
         raise HTTPException(status_code=400, detail="Only .vcf files are accepted")
     
-    vcf_valid = is_valid_vcf(content)
+    with profile.stage("is_valid_vcf"):
+        vcf_valid = is_valid_vcf(content)
     
     # Parse VCF
     variants = []
     if vcf_valid:
-        variants = parse_vcf_content(content)
-    
-    # Parse drugs list
-    drug_list = [d.strip().upper() for d in drugs.split(",") if d.strip()]
-    invalid_drugs = [d for d in drug_list if d not in SUPPORTED_DRUGS]
-    if invalid_drugs:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported drugs: {invalid_drugs}. Supported: {SUPPORTED_DRUGS}"
-        )
+        try:
+            if liftover_ready():
+                with profile.stage("parse_vcf_content"):
+                    variants = parse_vcf_content(content)
+            else:
+                # A GRCh37 file may load the chain file first; keep that off the event loop
+                with profile.stage("parse_vcf_content", profile=False):
+                    variants = await run_in_threadpool(parse_vcf_content, content)
+        except LiftoverError as e:
+            # Only GRCh37 input that needs the configured chain file gets here
+            raise HTTPException(status_code=503, detail=str(e))
     
+    drug_list = _parse_drug_list(drugs)
     pid = patient_id or f"PATIENT_{str(uuid.uuid4())[:8].upper()}"
-    timestamp = datetime.now(timezone.utc).isoformat()
     
-    results = []
+    report, exact_matches = await _analyze_variants(pid, drug_list, variants, vcf_valid, profile)
     
-    for drug in drug_list:
-        prediction = predict_drug_risk(drug, variants)
-        
-        # Get LLM explanation
-        variant_ids = [v.get("id", "unknown") for v in prediction["gene_variants"]]
-        variant_id_str = ", ".join(variant_ids) if variant_ids else "No variant detected"
-        
-        llm_explanation = await get_llm_explanation(
-            drug=drug,
-            gene=prediction["gene"],
-            variant_id=variant_id_str,
-            diplotype=prediction["diplotype"],
-            phenotype=prediction["phenotype_label"],
-            risk_label=prediction["risk_label"],
-            severity=prediction["severity"]
-        )
-        
-        result = {
-            "patient_id": pid,
-            "drug": drug,
-            "timestamp": timestamp,
-            "risk_assessment": {
-                "risk_label": prediction["risk_label"],
-                "confidence_score": prediction["confidence"],
-                "severity": prediction["severity"]
-            },
-            "pharmacogenomic_profile": {
-                "primary_gene": prediction["gene"],
-                "diplotype": prediction["diplotype"],
-                "phenotype": prediction["phenotype_label"],
-                "detected_variants": prediction["gene_variants"]
-            },
-            "clinical_recommendation": {
-                "action": prediction["action"],
-                "notes": prediction["notes"]
-            },
-            "llm_generated_explanation": llm_explanation,
-            "quality_metrics": {
-                "vcf_parsing_success": vcf_valid
-            }
-        }
-        results.append(result)
-    
-    # Generate overall risk summary
-    risk_levels = [r["risk_assessment"]["risk_label"] for r in results]
-    if "Toxic" in risk_levels or any(r["risk_assessment"]["severity"] == "critical" for r in results):
-        overall = "HIGH RISK: Critical drug-gene interactions detected. Immediate clinical review required."
-    elif "Adjust Dosage" in risk_levels or "Ineffective" in risk_levels:
-        overall = "MODERATE RISK: Dose adjustments or drug substitutions recommended."
-    else:
-        overall = "LOW RISK: No significant drug-gene interactions detected. Standard therapy appropriate."
+    # Only when RESULTS_ARCHIVE_PATH is set (used by rescore.py / export tooling); off the event loop
+    if RESULTS_ARCHIVE_PATH:
+        await run_in_threadpool(append_results, report["results"], exact_matches)
     
-    if len(results) == 1:
-        return JSONResponse(content=results[0])
+    if len(report["results"]) == 1:
+        return _respond(report["results"][0], profile)
     
-    return JSONResponse(content={
-        "patient_id": pid,
-        "timestamp": timestamp,
-        "results": results,
-        "overall_risk_summary": overall
-    })
+    return _respond(report, profile)
 
 
-@app.post("/analyze/demo")
-async def analyze_demo(drugs: str = Form(...)):
+@app.post("/analyze/demo", response_model=MultiDrugResult)
+async def analyze_demo(request: Request, drugs: str = Form(...)):
     """Demo endpoint with synthetic VCF data for testing."""
     
-    # Simulate some interesting variants
-    synthetic_variants = [
-        {"chrom": "22", "pos": "42526694", "id": "rs3892097", "ref": "C", "alt": "T",
-         "gene": "CYP2D6", "star_allele": "*4", "info": {"GENE": "CYP2D6", "RSID": "rs3892097"}},
-        {"chrom": "10", "pos": "96521657", "id": "rs4244285", "ref": "G", "alt": "A",
-         "gene": "CYP2C19", "star_allele": "*2", "info": {"GENE": "CYP2C19", "RSID": "rs4244285"}},
-        {"chrom": "10", "pos": "96741053", "id": "rs1057910", "ref": "A", "alt": "C",
-         "gene": "CYP2C9", "star_allele": "*3", "info": {"GENE": "CYP2C9", "RSID": "rs1057910"}},
-        {"chrom": "12", "pos": "21331549", "id": "rs4149056", "ref": "T", "alt": "C",
-         "gene": "SLCO1B1", "star_allele": "*5", "info": {"GENE": "SLCO1B1", "RSID": "rs4149056"}},
-    ]
-    
-    drug_list = [d.strip().upper() for d in drugs.split(",") if d.strip()]
-    invalid_drugs = [d for d in drug_list if d not in SUPPORTED_DRUGS]
-    if invalid_drugs:
-        raise HTTPException(status_code=400, detail=f"Unsupported drugs: {invalid_drugs}")
-    
+    profile = request_profile(request)
+    drug_list = _parse_drug_list(drugs)
     pid = f"DEMO_{str(uuid.uuid4())[:8].upper()}"
-    timestamp = datetime.now(timezone.utc).isoformat()
-    results = []
-    
-    for drug in drug_list:
-        prediction = predict_drug_risk(drug, synthetic_variants)
-        variant_id_str = ", ".join([v.get("id", "unknown") for v in prediction["gene_variants"]]) or "No variant detected"
-        
-        llm_explanation = await get_llm_explanation(
-            drug=drug, gene=prediction["gene"],
-            variant_id=variant_id_str, diplotype=prediction["diplotype"],
-            phenotype=prediction["phenotype_label"],
-            risk_label=prediction["risk_label"], severity=prediction["severity"]
-        )
-        
-        results.append({
-            "patient_id": pid, "drug": drug, "timestamp": timestamp,
-            "risk_assessment": {
-                "risk_label": prediction["risk_label"],
-                "confidence_score": prediction["confidence"],
-                "severity": prediction["severity"]
-            },
-            "pharmacogenomic_profile": {
-                "primary_gene": prediction["gene"], "diplotype": prediction["diplotype"],
-                "phenotype": prediction["phenotype_label"],
-                "detected_variants": prediction["gene_variants"]
-            },
-            "clinical_recommendation": {"action": prediction["action"], "notes": prediction["notes"]},
-            "llm_generated_explanation": llm_explanation,
-            "quality_metrics": {"vcf_parsing_success": True}
-        })
-    
-    risk_levels = [r["risk_assessment"]["risk_label"] for r in results]
-    if "Toxic" in risk_levels:
-        overall = "HIGH RISK: Critical drug-gene interactions detected. Immediate clinical review required."
-    elif "Adjust Dosage" in risk_levels or "Ineffective" in risk_levels:
-        overall = "MODERATE RISK: Dose adjustments or drug substitutions recommended."
-    else:
-        overall = "LOW RISK: No significant drug-gene interactions detected."
     
-    return JSONResponse(content={
-        "patient_id": pid, "timestamp": timestamp,
-        "results": results, "overall_risk_summary": overall
-    })
+    report, _ = await _analyze_variants(pid, drug_list, DEMO_VARIANTS, vcf_valid=True, profile=profile)
+    return _respond(report, profile)
@@ -0,0 +1,150 @@
+"""
+Local mock LLM provider for load testing — no paid API calls.
+
+Emulates the two endpoints llm_service talks to:
+  POST /v1/chat/completions                         (OpenAI, _call_openai)
+  POST /v1beta/models/<model>:generateContent       (Gemini, _call_gemini)
+
+    python mock_llm.py --port 9000 --latency-ms 800 --jitter-ms 300 --error-rate 0.02 --rate-limit 50
+
+Then start the API against it:
+
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app
+    # or: GEMINI_API_KEY=mock GEMINI_BASE_URL=http://127.0.0.1:9000/v1beta uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+CONFIG = {
+    "latency_ms": float(os.getenv("MOCK_LLM_LATENCY_MS", "500")),
+    "jitter_ms": float(os.getenv("MOCK_LLM_JITTER_MS", "200")),
+    "error_rate": float(os.getenv("MOCK_LLM_ERROR_RATE", "0")),    # fraction of 500 responses
+    "rate_limit": float(os.getenv("MOCK_LLM_RATE_LIMIT", "0")),    # requests/second, 0 = unlimited
+}
+
+STATS = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+app = FastAPI(title="PharmaGuard mock LLM provider")
+
+
+class _TokenBucket:
+    def __init__(self):
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+    def take(self, rate: float) -> bool:
+        if rate <= 0:
+            return True
+        now = time.monotonic()
+        # burst capacity of one second's worth of requests
+        self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+_BUCKET = _TokenBucket()
+_BUCKET.tokens = CONFIG["rate_limit"]
+
+
+def _explanation(prompt: str) -> str:
+    fields = dict(re.findall(r"- (Drug|Gene|Diplotype|Phenotype|Predicted Risk): (.*)", prompt))
+    drug, gene = fields.get("Drug", "the drug"), fields.get("Gene", "the gene")
+    return json.dumps({
+        "summary": f"[mock] {gene} {fields.get('Diplotype', '')} ({fields.get('Phenotype', '')}) "
+                   f"affects {drug}: {fields.get('Predicted Risk', 'Unknown')}.",
+        "mechanism": f"[mock] Altered {gene} activity changes {drug} metabolism.",
+        "clinical_impact": f"[mock] Review {drug} dosing guidance for this {gene} phenotype.",
+    })
+
+
+async def _gate():
+    """Apply rate limit, latency and error injection; return an error response or None."""
+    STATS["requests"] += 1
+    if not _BUCKET.take(CONFIG["rate_limit"]):
+        STATS["rate_limited"] += 1
+        return JSONResponse(status_code=429, content={"error": {"code": 429, "message": "Rate limit exceeded"}})
+    delay = max(0.0, CONFIG["latency_ms"] + random.uniform(-CONFIG["jitter_ms"], CONFIG["jitter_ms"]))
+    await asyncio.sleep(delay / 1000)
+    if random.random() < CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"code": 500, "message": "Injected failure"}})
+    STATS["ok"] += 1
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = await _gate()
+    if error:
+        return error
+    prompt = body["messages"][-1]["content"]
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": _explanation(prompt)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 120, "total_tokens": len(prompt) // 4 + 120},
+    }
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    if not model_action.endswith(":generateContent"):
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not found"}})
+    body = await request.json()
+    error = await _gate()
+    if error:
+        return error
+    prompt = body["contents"][0]["parts"][0]["text"]
+    return {
+        "candidates": [{
+            # Gemini tends to wrap JSON in a markdown fence, which _call_gemini strips
+            "content": {"role": "model", "parts": [{"text": f"```json\n{_explanation(prompt)}\n```"}]},
+            "finishReason": "STOP",
+        }],
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {**STATS, "config": CONFIG}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9000)
+    ap.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    ap.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    ap.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    ap.add_argument("--rate-limit", type=float, default=CONFIG["rate_limit"], help="requests/second, 0 = unlimited")
+    args = ap.parse_args()
+
+    CONFIG.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  error_rate=args.error_rate, rate_limit=args.rate_limit)
+    _BUCKET.tokens = args.rate_limit
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,16 @@ import io
 import re
 from typing import List, Dict, Any
 
+from liftover import LiftoverError, detect_assembly, gene_at, load_liftover_index, normalize_chrom, to_grch38
+
 TARGET_GENES = {"CYP2D6", "CYP2C19", "CYP2C9", "SLCO1B1", "TPMT", "DPYD"}
 
 
 def parse_vcf_content(content: bytes) -> List[Dict[str, Any]]:
-    """Parse VCF file content and extract pharmacogenomic variants."""
+    """
+    Parse VCF file content and extract pharmacogenomic variants.
+    Raises LiftoverError if a GRCh37 file needs the configured chain file and it cannot be loaded.
+    """
     variants = []
     
     try:
@@ -14,11 +19,18 @@ def parse_vcf_content(content: bytes) -> List[Dict[str, Any]]:
         lines = text.splitlines()
         
         header_cols = []
+        meta_lines = []
+        assembly = None
+        liftover_index = None
         for line in lines:
             if line.startswith("##"):
+                meta_lines.append(line)
                 continue
             elif line.startswith("#CHROM"):
                 header_cols = line.lstrip("#").split("\t")
+                assembly = detect_assembly(meta_lines)
+                if assembly == "GRCh37":
+                    liftover_index = load_liftover_index()
                 continue
             
             if not line.strip():
@@ -30,7 +42,7 @@ def parse_vcf_content(content: bytes) -> List[Dict[str, Any]]:
             
             chrom = parts[0]
             pos = parts[1]
-            variant_id = parts[2] if parts[2] != "." else f"chr{chrom}:{pos}"
+            variant_id = parts[2] if parts[2] != "." else f"chr{normalize_chrom(chrom)}:{pos}"
             ref = parts[3]
             alt = parts[4]
             info_str = parts[7] if len(parts) > 7 else ""
@@ -48,9 +60,13 @@ def parse_vcf_content(content: bytes) -> List[Dict[str, Any]]:
             rsid = info.get("RSID", variant_id)
             star_allele = info.get("STAR", "")
             
-            # Try to infer gene from variant ID or chrom position if not in INFO
+            # Try to infer gene from variant ID if not in INFO. Position is only used for
+            # records with no ID at all: an rsID outside RSID_GENE_MAP is an incidental
+            # variant that happens to sit in the locus and must not change the call.
             if not gene:
                 gene = _infer_gene_from_rsid(rsid)
+            if not gene and parts[2] == "." and "RSID" not in info:
+                gene = _infer_gene_from_position(chrom, pos, assembly, liftover_index)
             
             if gene in TARGET_GENES:
                 variants.append({
@@ -64,6 +80,8 @@ def parse_vcf_content(content: bytes) -> List[Dict[str, Any]]:
                     "info": info
                 })
     
+    except LiftoverError:
+        raise  # configuration problem, not bad input — must not silently drop variants
     except Exception as e:
         pass  # Return empty list on parse failure
     
@@ -99,6 +117,17 @@ def _infer_gene_from_rsid(rsid: str) -> str:
     return RSID_GENE_MAP.get(rsid, "")
 
 
+def _infer_gene_from_position(chrom: str, pos: str, assembly: str | None, liftover_index) -> str:
+    """Map a coordinate to a pharmacogene locus, lifting GRCh37 input to GRCh38 first."""
+    try:
+        lifted = to_grch38(chrom, int(pos), assembly, liftover_index)
+    except (ValueError, IndexError):
+        return ""  # one odd record must not abort the rest of the file
+    if lifted is None:
+        return ""
+    return gene_at(*lifted)
+
+
 def is_valid_vcf(content: bytes) -> bool:
     """Basic VCF validation."""
     try:
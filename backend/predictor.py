@@ -178,15 +178,21 @@ PHENOTYPE_LABELS = {
 # -------------------------------
 # Risk Evaluation Function  (exact logic from reference)
 # -------------------------------
-def evaluate_risk(drug: str, gene: str, phenotype: str) -> Dict[str, Any]:
+def evaluate_risk(
+    drug: str,
+    gene: str,
+    phenotype: str,
+    risk_rules: Dict[str, Dict[str, Dict[str, Dict[str, str]]]] = DRUG_RISK_RULES,
+) -> Dict[str, Any]:
     """
-    Look up drug × gene × phenotype in DRUG_RISK_RULES.
+    Look up drug × gene × phenotype in DRUG_RISK_RULES (or another version
+    of the rule table, e.g. when re-scoring archived results).
     Returns: {risk, severity, rule_matched}
     """
     drug = drug.upper()
-    if drug not in DRUG_RISK_RULES:
+    if drug not in risk_rules:
         return {"risk": "Unknown", "severity": "none", "rule_matched": False}
-    gene_rules = DRUG_RISK_RULES[drug].get(gene)
+    gene_rules = risk_rules[drug].get(gene)
     if not gene_rules:
         return {"risk": "Unknown", "severity": "none", "rule_matched": False}
     if phenotype not in gene_rules:
@@ -229,7 +235,12 @@ def calculate_confidence(
 # -------------------------------
 # Main prediction entry point
 # -------------------------------
-def predict_drug_risk(drug: str, variants: List[Dict[str, Any]]) -> Dict[str, Any]:
+def predict_drug_risk(
+    drug: str,
+    variants: List[Dict[str, Any]],
+    phenotype_map: Dict[str, Dict[str, Any]] = GENE_PHENOTYPE_MAP,
+    risk_rules: Dict[str, Dict[str, Dict[str, Dict[str, str]]]] = DRUG_RISK_RULES,
+) -> Dict[str, Any]:
     gene = DRUG_GENE_MAP.get(drug, "")
 
     if not gene:
@@ -239,8 +250,8 @@ def predict_drug_risk(drug: str, variants: List[Dict[str, Any]]) -> Dict[str, An
     gene_variants = [v for v in variants if v.get("gene") == gene]
 
     # ── 2. Resolve diplotype + phenotype from detected variants ───────────────
-    diplotype     = GENE_PHENOTYPE_MAP[gene]["default"][0]
-    phenotype_code= GENE_PHENOTYPE_MAP[gene]["default"][1]
+    diplotype     = phenotype_map[gene]["default"][0]
+    phenotype_code= phenotype_map[gene]["default"][1]
 
     matched_variant   = None   # strongest risk-variant found
     exact_match       = False  # True when rsID hits the risk_variants table exactly
@@ -248,8 +259,8 @@ def predict_drug_risk(drug: str, variants: List[Dict[str, Any]]) -> Dict[str, An
 
     for variant in gene_variants:
         rsid = variant.get("id", "")
-        if rsid in GENE_PHENOTYPE_MAP[gene]["risk_variants"]:
-            diplotype, phenotype_code = GENE_PHENOTYPE_MAP[gene]["risk_variants"][rsid]
+        if rsid in phenotype_map[gene]["risk_variants"]:
+            diplotype, phenotype_code = phenotype_map[gene]["risk_variants"][rsid]
             matched_variant = variant
             exact_match     = True
             break
@@ -259,7 +270,7 @@ def predict_drug_risk(drug: str, variants: List[Dict[str, Any]]) -> Dict[str, An
         partial_assumption = True
 
     # ── 3. Evaluate risk using the reference rule table ───────────────────────
-    eval_result = evaluate_risk(drug, gene, phenotype_code)
+    eval_result = evaluate_risk(drug, gene, phenotype_code, risk_rules)
     risk_label  = eval_result["risk"]
     severity    = eval_result["severity"]
     rule_matched= eval_result["rule_matched"]
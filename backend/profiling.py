@@ -0,0 +1,94 @@
+import hmac
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from fastapi import HTTPException, Request
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "20"))  # profiles kept on disk
+ADMIN_TOKEN = os.getenv("PHARMAGUARD_ADMIN_TOKEN", "")
+
+PROFILE_HEADER = "x-pharmaguard-profile"
+ADMIN_HEADER = "x-admin-token"
+
+
+class RequestProfile:
+    """
+    Collects stage timings for one request and, when enabled, runs the
+    synchronous stages under cProfile. Stages that await (LLM calls) are
+    timed only — profiling across an await would pick up other requests.
+    """
+
+    def __init__(self, enabled: bool = False, label: str = ""):
+        self.enabled = enabled
+        self.label = label
+        self.profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}_{uuid.uuid4().hex[:8]}" if enabled else ""
+        self.stages: List[Tuple[str, float]] = []
+        self._profiler = None
+        if enabled:
+            import cProfile  # only profiled requests pay for the import
+            self._profiler = cProfile.Profile()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, profile: bool = True):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        if profile:
+            self._profiler.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                self._profiler.disable()
+            self.stages.append((name, time.perf_counter() - start))
+
+    def dump(self) -> str | None:
+        """Write <id>.prof (pstats) and <id>.json (stage timings) to PROFILE_DIR."""
+        if not self.enabled:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, self.profile_id)
+        self._profiler.dump_stats(base + ".prof")
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "profile_id": self.profile_id,
+                "label": self.label,
+                "total_seconds": time.perf_counter() - self._started,
+                "stages": [{"name": n, "seconds": s} for n, s in self.stages],
+            }, f, indent=2)
+        _prune_profiles()
+        return self.profile_id
+
+
+def _prune_profiles() -> None:
+    """Keep only the newest PROFILE_MAX_FILES profiles."""
+    ids = sorted({os.path.splitext(name)[0] for name in os.listdir(PROFILE_DIR)
+                  if name.endswith((".prof", ".json"))})
+    # ids start with a UTC timestamp, so lexical order is chronological
+    for stale in ids[:max(0, len(ids) - PROFILE_MAX_FILES)]:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, stale + ext))
+            except FileNotFoundError:
+                pass
+
+
+def request_profile(request: Request) -> RequestProfile:
+    """Return an enabled RequestProfile if this request asked for one and is allowed to."""
+    if request.headers.get(PROFILE_HEADER, "").lower() not in ("1", "true", "yes"):
+        return RequestProfile()
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Request profiling is disabled on this server")
+    token = request.headers.get(ADMIN_HEADER, "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Request profiling is restricted to admins")
+    return RequestProfile(enabled=True, label=f"{request.method} {request.url.path}")
@@ -0,0 +1,234 @@
+"""
+Incremental re-scoring of archived results after a rule-table change.
+
+Diffs two versions of GENE_PHENOTYPE_MAP / DRUG_RISK_RULES, turns the diff
+into index keys, and re-evaluates only the archived AnalysisResult records
+that hit those keys.
+
+    # before editing predictor.py, freeze the current tables
+    python rescore.py snapshot rules_v1.json
+
+    # after editing: re-score affected records against the live tables
+    python rescore.py run --old rules_v1.json --archive results.jsonl --report changes.jsonl
+
+The key index is kept next to the archive (<archive>.idx.json). Because the
+archive is append-only, each run only indexes lines added since the last one.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from archive import EXACT_MATCH_FIELD, RESULTS_ARCHIVE_PATH, archive_end, iter_archive, read_record
+from predictor import DRUG_RISK_RULES, GENE_PHENOTYPE_MAP, PHENOTYPE_LABELS, predict_drug_risk
+
+INDEX_VERSION = 2
+
+# Index keys, joined with "|" on disk:
+#   rule|<drug>|<gene>|<phenotype_code>  – record was scored with this DRUG_RISK_RULES entry
+#   variant|<gene>|<rsid>                – record carries this variant (hits risk_variants)
+#   default|<gene>                       – record was scored with the gene's default diplotype
+Key = Tuple[str, ...]
+
+_PHENOTYPE_CODES = {label: code for code, label in PHENOTYPE_LABELS.items()}
+
+
+# -------------------------------
+# Rule-table snapshots
+# -------------------------------
+def current_tables() -> Dict[str, Any]:
+    return {"GENE_PHENOTYPE_MAP": GENE_PHENOTYPE_MAP, "DRUG_RISK_RULES": DRUG_RISK_RULES}
+
+
+def save_snapshot(path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(current_tables(), f, indent=2, sort_keys=True)
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """Load a snapshot, restoring the (diplotype, phenotype) tuples JSON turned into lists."""
+    with open(path) as f:
+        tables = json.load(f)
+    for gene_map in tables["GENE_PHENOTYPE_MAP"].values():
+        gene_map["default"] = tuple(gene_map["default"])
+        gene_map["risk_variants"] = {k: tuple(v) for k, v in gene_map["risk_variants"].items()}
+    return tables
+
+
+# -------------------------------
+# Diff
+# -------------------------------
+def diff_tables(old: Dict[str, Any], new: Dict[str, Any]) -> Set[Key]:
+    """Return the index keys whose rule-table entries differ between two versions."""
+    changed: Set[Key] = set()
+
+    old_rules, new_rules = old["DRUG_RISK_RULES"], new["DRUG_RISK_RULES"]
+    for drug in old_rules.keys() | new_rules.keys():
+        old_genes, new_genes = old_rules.get(drug, {}), new_rules.get(drug, {})
+        for gene in old_genes.keys() | new_genes.keys():
+            old_pheno, new_pheno = old_genes.get(gene, {}), new_genes.get(gene, {})
+            for phenotype in old_pheno.keys() | new_pheno.keys():
+                if old_pheno.get(phenotype) != new_pheno.get(phenotype):
+                    changed.add(("rule", drug, gene, phenotype))
+
+    old_map, new_map = old["GENE_PHENOTYPE_MAP"], new["GENE_PHENOTYPE_MAP"]
+    for gene in old_map.keys() | new_map.keys():
+        old_gene, new_gene = old_map.get(gene, {}), new_map.get(gene, {})
+        if tuple(old_gene.get("default", ())) != tuple(new_gene.get("default", ())):
+            changed.add(("default", gene))
+        old_rv, new_rv = old_gene.get("risk_variants", {}), new_gene.get("risk_variants", {})
+        for rsid in old_rv.keys() | new_rv.keys():
+            if tuple(old_rv.get(rsid, ())) != tuple(new_rv.get(rsid, ())):
+                changed.add(("variant", gene, rsid))
+
+    return changed
+
+
+# -------------------------------
+# Index
+# -------------------------------
+def record_keys(record: Dict[str, Any]) -> List[Key]:
+    drug = record["drug"]
+    profile = record["pharmacogenomic_profile"]
+    gene = profile["primary_gene"]
+    phenotype_code = _PHENOTYPE_CODES.get(profile["phenotype"], profile["phenotype"])
+    keys: List[Key] = [("rule", drug, gene, phenotype_code)]
+    keys += [("variant", gene, v.get("id", "")) for v in profile["detected_variants"]]
+    # A record whose diplotype came from a risk variant only moves to the default when that
+    # variant's entry changes, which its variant key already covers. Records archived
+    # without the flag are treated as default-scored.
+    if not record.get(EXACT_MATCH_FIELD, False):
+        keys.append(("default", gene))
+    return keys
+
+
+def load_index(archive_path: str) -> Dict[str, Any]:
+    """Load the sidecar index and extend it with any lines appended since it was written."""
+    index_path = archive_path + ".idx.json"
+    index = {"version": INDEX_VERSION, "indexed_until": 0, "keys": {}}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            stored = json.load(f)
+        if stored.get("version") == INDEX_VERSION:
+            index = stored
+
+    end = archive_end(archive_path)
+    if end < index["indexed_until"]:
+        # archive was truncated or replaced — start over
+        index = {"version": INDEX_VERSION, "indexed_until": 0, "keys": {}}
+    if end > index["indexed_until"]:
+        keys = index["keys"]
+        for offset, record in iter_archive(archive_path, index["indexed_until"], end):
+            for key in record_keys(record):
+                keys.setdefault("|".join(key), []).append(offset)
+        index["indexed_until"] = end
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def affected_offsets(index: Dict[str, Any], changed: Iterable[Key]) -> List[int]:
+    offsets: Set[int] = set()
+    for key in changed:
+        offsets.update(index["keys"].get("|".join(key), ()))
+    return sorted(offsets)
+
+
+# -------------------------------
+# Re-evaluation
+# -------------------------------
+def rescore_record(record: Dict[str, Any], tables: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Re-run prediction for one archived record; return a change entry, or None if unchanged."""
+    profile = record["pharmacogenomic_profile"]
+    prediction = predict_drug_risk(
+        record["drug"], profile["detected_variants"],
+        phenotype_map=tables["GENE_PHENOTYPE_MAP"], risk_rules=tables["DRUG_RISK_RULES"],
+    )
+    before = {
+        "diplotype": profile["diplotype"],
+        "phenotype": profile["phenotype"],
+        "risk_label": record["risk_assessment"]["risk_label"],
+        "severity": record["risk_assessment"]["severity"],
+        "confidence_score": record["risk_assessment"]["confidence_score"],
+    }
+    after = {
+        "diplotype": prediction["diplotype"],
+        "phenotype": prediction["phenotype_label"],
+        "risk_label": prediction["risk_label"],
+        "severity": prediction["severity"],
+        "confidence_score": prediction["confidence"],
+    }
+    if before == after:
+        return None
+    return {
+        "patient_id": record["patient_id"],
+        "drug": record["drug"],
+        "gene": profile["primary_gene"],
+        "timestamp": record["timestamp"],
+        "changed_fields": sorted(k for k in before if before[k] != after[k]),
+        "before": before,
+        "after": after,
+    }
+
+
+def rescore(archive_path: str, old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    changed = diff_tables(old, new)
+    index = load_index(archive_path)
+    offsets = affected_offsets(index, changed)
+
+    changes = []
+    with open(archive_path, "rb") as f:
+        for offset in offsets:
+            entry = rescore_record(read_record(f, offset), new)
+            if entry:
+                changes.append(entry)
+
+    summary = {
+        "changed_rule_keys": sorted("|".join(k) for k in changed),
+        "records_indexed_bytes": index["indexed_until"],
+        "records_reevaluated": len(offsets),
+        "records_changed": len(changes),
+        "patients_affected": len({c["patient_id"] for c in changes}),
+    }
+    return changes, summary
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="write the current rule tables to a JSON snapshot")
+    snap.add_argument("path")
+
+    run = sub.add_parser("run", help="re-score archived results affected by a rule change")
+    run.add_argument("--old", required=True, help="snapshot of the rule tables the archive was scored with")
+    run.add_argument("--new", help="snapshot of the new rule tables (default: live predictor tables)")
+    run.add_argument("--archive", default=RESULTS_ARCHIVE_PATH, help="JSONL results archive")
+    run.add_argument("--report", help="write one JSON line per changed record here (default: stdout)")
+
+    args = ap.parse_args(argv)
+    if args.command == "snapshot":
+        save_snapshot(args.path)
+        return 0
+
+    if not args.archive:
+        ap.error("--archive is required when RESULTS_ARCHIVE_PATH is not set")
+    old = load_snapshot(args.old)
+    new = load_snapshot(args.new) if args.new else current_tables()
+    changes, summary = rescore(args.archive, old, new)
+
+    out = open(args.report, "w") if args.report else sys.stdout
+    try:
+        for entry in changes:
+            out.write(json.dumps(entry) + "\n")
+    finally:
+        if args.report:
+            out.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import gzip
+import json
+import os
+import warnings
+from typing import Any, Set, Tuple
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional — fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional — only gzip is offered without it
+    brotli = None
+
+# "off" | "gzip" | "br" | "auto" (brotli when available and accepted, else gzip)
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "off").lower()
+COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def dumps_json(content: Any) -> bytes:
+    """Compact JSON bytes for plain dict/list content."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content-codings listed in an Accept-Encoding header, minus those refused with q=0."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding.strip() and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class BrotliResponder(IdentityResponder):
+    """Starlette's compression responder (streaming, Vary, excluded types) with a brotli encoder."""
+
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int):
+        super().__init__(app, minimum_size)
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        out = self._compressor.process(body)
+        return out + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Negotiates the response encoding from Accept-Encoding (honouring q=0) in
+    order of preference: brotli via BrotliResponder, gzip via Starlette's
+    GZipMiddleware, otherwise the response is passed through untouched.
+    """
+
+    def __init__(self, app, encodings: Tuple[str, ...], minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=GZIP_LEVEL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            for encoding in self.encodings:
+                if encoding not in accepted:
+                    continue
+                if encoding == "br":
+                    await BrotliResponder(self.app, self.minimum_size)(scope, receive, send)
+                else:
+                    await self.gzip(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def add_compression(app, mode: str = RESPONSE_COMPRESSION, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+    """Install response compression for `mode` (see RESPONSE_COMPRESSION); warns on unusable settings."""
+    if mode == "off":
+        return
+    if mode not in ("gzip", "br", "auto"):
+        warnings.warn(f"RESPONSE_COMPRESSION={mode!r} is not one of off/gzip/br/auto; compression is off")
+        return
+    if brotli is None:
+        if mode == "br":
+            warnings.warn("RESPONSE_COMPRESSION=br but the brotli package is not installed; falling back to gzip")
+        encodings = ("gzip",)
+    elif mode == "auto":
+        encodings = ("br", "gzip")
+    else:
+        encodings = (mode,)
+    app.add_middleware(CompressionMiddleware, encodings=encodings, minimum_size=minimum_size)
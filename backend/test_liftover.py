@@ -0,0 +1,218 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import liftover
+import llm_service
+import main
+from liftover import LiftoverError, LiftoverIndex, detect_assembly, load_liftover_index, to_grch38
+from parser import parse_vcf_content
+from predictor import predict_drug_risk
+
+# chr10: two plus-strand blocks with a 10/10 gap; chr22: one block aligned to the minus strand
+CHAIN = (
+    "chain 1000 chr10 135534747 + 96000000 97000000 chr10 133797422 + 94260000 95260000 1\n"
+    "500000 10 10\n"
+    "499990\n"
+    "\n"
+    "chain 900 chr22 51304566 + 42500000 42600000 chr22 50818468 - 100 100100 2\n"
+    "100000\n"
+)
+
+VCF_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##reference=GRCh37\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+)
+
+
+@pytest.fixture
+def chain_path(tmp_path):
+    path = tmp_path / "test.chain"
+    path.write_text(CHAIN)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def reset_liftover(monkeypatch):
+    monkeypatch.setattr(liftover, "_INDEXES", {})
+    monkeypatch.setattr(liftover, "_LOAD_ERRORS", {})
+
+
+def test_lift_plus_strand_minus_strand_and_gaps(chain_path):
+    index = LiftoverIndex.from_chain_file(chain_path)
+    assert index.lift("chr10", 96000001) == ("10", 94260001)
+    assert index.lift("10", 96521657) == ("10", 94781657)
+    # 1-based 96500001..96500010 is the unaligned gap between the two blocks
+    assert index.lift("10", 96500005) is None
+    assert index.lift("10", 96500011) == ("10", 94760011)
+    assert index.lift("10", 95000000) is None
+    assert index.lift("22", 42500001) == ("22", 50818368)
+    assert index.lift("22", 42600000) == ("22", 50718369)
+    assert index.lift("7", 1000) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("##reference=GRCh38", "GRCh38"),
+    ("##reference=file:///ref/human_g1k_v37.fasta", "GRCh37"),
+    ("##reference=file:///ref/Homo_sapiens_assembly38.fasta", "GRCh38"),
+    ("##contig=<ID=1,length=249250621>", "GRCh37"),
+    ("##contig=<ID=chr1,length=248956422>", "GRCh38"),
+    ("##source=somecaller", None),
+])
+def test_detect_assembly(header, expected):
+    assert detect_assembly([header]) == expected
+
+
+def test_unknown_build_skips_position_assignment(chain_path):
+    index = load_liftover_index(chain_path)
+    assert to_grch38("10", 94781657, None, index) is None
+    assert to_grch38("chr10", 94781657, "GRCh38", index) == ("10", 94781657)
+    assert to_grch38("10", 96521657, "GRCh37", None) is None
+
+
+@pytest.mark.parametrize("content", [
+    "chain 1000 chr10 135534747 + 96000000 97000000 chr10 133797422 + 94260000 95260000 1\n500000 10 10\n",
+    "500000 10 10\n",
+    "not a chain file\n",
+])
+def test_bad_chain_file_fails_loudly_until_fixed_on_disk(tmp_path, monkeypatch, content):
+    path = tmp_path / "bad.chain"
+    path.write_text(content)
+    with pytest.raises(LiftoverError):
+        load_liftover_index(str(path))
+
+    reads = []
+    real_parse = LiftoverIndex.from_chain_file.__func__
+
+    def counting_parse(cls, p):
+        reads.append(p)
+        return real_parse(cls, p)
+
+    monkeypatch.setattr(LiftoverIndex, "from_chain_file", classmethod(counting_parse))
+    with pytest.raises(LiftoverError):
+        load_liftover_index(str(path))
+    assert reads == []  # cached failure, file not re-read
+
+    path.write_text(CHAIN)
+    assert load_liftover_index(str(path)) is not None
+    assert reads == [str(path)]
+
+
+def test_concurrent_first_loads_parse_the_chain_once(chain_path, monkeypatch):
+    reads = []
+    real_parse = LiftoverIndex.from_chain_file.__func__
+
+    def slow_parse(cls, path):
+        reads.append(path)
+        time.sleep(0.05)
+        return real_parse(cls, path)
+
+    monkeypatch.setattr(LiftoverIndex, "from_chain_file", classmethod(slow_parse))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        indexes = list(pool.map(lambda _: load_liftover_index(chain_path), range(8)))
+    assert reads == [chain_path]
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_bad_chain_does_not_silently_drop_variants(tmp_path, monkeypatch):
+    path = tmp_path / "bad.chain"
+    path.write_text("garbage\n")
+    monkeypatch.setattr(liftover, "LIFTOVER_CHAIN_PATH", str(path))
+    vcf = (
+        VCF_HEADER
+        + "3\t1000\t.\tA\tG\t50\tPASS\tDP=10\n"
+        + "22\t42526694\trs3892097\tC\tT\t60\tPASS\tGENE=CYP2D6;RSID=rs3892097\n"
+    ).encode()
+    with pytest.raises(LiftoverError):
+        parse_vcf_content(vcf)
+
+
+def test_grch37_position_assignment_through_chain(chain_path, monkeypatch):
+    monkeypatch.setattr(liftover, "LIFTOVER_CHAIN_PATH", chain_path)
+    vcf = (
+        VCF_HEADER
+        + "3\t1000\t.\tA\tG\t50\tPASS\tDP=10\n"
+        + "chr10\t96521657\t.\tG\tA\t60\tPASS\tDP=30\n"
+        + "22\t42526694\trs3892097\tC\tT\t60\tPASS\tGENE=CYP2D6;RSID=rs3892097\n"
+    ).encode()
+    variants = parse_vcf_content(vcf)
+    assert [(v["id"], v["gene"]) for v in variants] == [
+        ("chr10:96521657", "CYP2C19"), ("rs3892097", "CYP2D6"),
+    ]
+    prediction = predict_drug_risk("CODEINE", variants)
+    assert (prediction["diplotype"], prediction["risk_label"]) == ("*1/*4", "Adjust Dosage")
+
+
+GRCH38_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##contig=<ID=chr1,length=248956422>\n"
+    "##contig=<ID=chr22,length=50818468>\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+)
+
+
+def test_incidental_locus_variants_do_not_change_the_call():
+    # 50 dbSNP records inside the GRCh38 CYP2D6 locus that are not pharmacogenomic markers
+    incidental = "".join(f"chr22\t{42126600 + i * 50}\trs{90000000 + i}\tA\tG\t50\tPASS\tDP=30\n" for i in range(50))
+    plain = parse_vcf_content(GRCH38_HEADER.encode())
+    noisy = parse_vcf_content((GRCH38_HEADER + incidental).encode())
+    assert noisy == plain == []
+    assert predict_drug_risk("CODEINE", noisy) == predict_drug_risk("CODEINE", plain)
+
+    # a record with no ID at all is still placed by position
+    unnamed = parse_vcf_content((GRCH38_HEADER + "chr22\t42127000\t.\tA\tG\t50\tPASS\tDP=30\n").encode())
+    assert [(v["id"], v["gene"]) for v in unnamed] == [("chr22:42127000", "CYP2D6")]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    prompts = []
+
+    async def capture(**kwargs):
+        prompts.append(kwargs)
+        return {"summary": "s", "mechanism": "m", "clinical_impact": "c"}
+
+    monkeypatch.setattr(main, "get_llm_explanation", capture)
+    monkeypatch.setattr(llm_service, "OPENAI_API_KEY", "")
+    monkeypatch.setattr(llm_service, "GEMINI_API_KEY", "")
+    with TestClient(main.app) as client:
+        yield client, prompts
+
+
+def _analyze(client, vcf: str):
+    return client.post("/analyze", files={"file": ("p.vcf", vcf.encode())}, data={"drugs": "CODEINE"})
+
+
+def test_incidental_locus_variants_keep_confidence_and_prompt(api):
+    client, prompts = api
+    marker = "chr22\t42130692\trs3892097\tC\tT\t60\tPASS\tDP=40\n"
+    incidental = "".join(f"chr22\t{42126600 + i * 50}\trs{90000000 + i}\tA\tG\t50\tPASS\tDP=30\n" for i in range(50))
+    for body in ("", marker):
+        before = _analyze(client, GRCH38_HEADER + body).json()
+        after = _analyze(client, GRCH38_HEADER + body + incidental).json()
+        assert after["risk_assessment"] == before["risk_assessment"]
+        assert after["pharmacogenomic_profile"]["detected_variants"] == before["pharmacogenomic_profile"]["detected_variants"]
+        assert prompts[-1] == prompts[-2]
+    assert prompts[0]["variant_id"] == "No variant detected"
+    assert _analyze(client, GRCH38_HEADER).json()["risk_assessment"]["confidence_score"] == 0.85
+
+
+def test_bad_chain_only_fails_grch37_requests(api, tmp_path, monkeypatch):
+    client, _ = api
+    path = tmp_path / "bad.chain"
+    path.write_text("garbage\n")
+    monkeypatch.setattr(liftover, "LIFTOVER_CHAIN_PATH", str(path))
+    tagged = "22\t42526694\trs3892097\tC\tT\t60\tPASS\tGENE=CYP2D6;RSID=rs3892097\n"
+
+    assert _analyze(client, GRCH38_HEADER + tagged).status_code == 200
+    no_build = "##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+    assert _analyze(client, no_build + tagged).status_code == 200
+    r = _analyze(client, VCF_HEADER + tagged)
+    assert r.status_code == 503
+    assert "bad.chain" in r.json()["detail"]
+
+    path.write_text(CHAIN)  # fixed on disk: no restart needed
+    assert _analyze(client, VCF_HEADER + tagged).status_code == 200
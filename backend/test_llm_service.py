@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import llm_service
+from llm_service import get_llm_explanation
+
+ARGS = dict(drug="CODEINE", gene="CYP2D6", variant_id="rs3892097", diplotype="*1/*4",
+            phenotype="Intermediate Metabolizer", risk_label="Adjust Dosage", severity="moderate")
+EXPLANATION = {"summary": "s", "mechanism": "m", "clinical_impact": "c"}
+
+
+class SlowProvider:
+    """Stands in for _resolve_explanation: blocks until released, counts calls and cancellations."""
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def __call__(self, *args):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return dict(EXPLANATION)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(llm_service, "_INFLIGHT", {})
+    monkeypatch.setattr(llm_service, "LLM_STATS", {"requests": 0, "executed": 0, "coalesced": 0})
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = SlowProvider()
+    monkeypatch.setattr(llm_service, "_resolve_explanation", provider)
+    return provider
+
+
+def test_concurrent_identical_calls_share_one_provider_call(provider):
+    n = 20
+
+    async def scenario():
+        tasks = [asyncio.create_task(get_llm_explanation(**ARGS)) for _ in range(n)]
+        await asyncio.sleep(0)
+        assert len(llm_service._INFLIGHT) == 1
+        provider.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert results == [EXPLANATION] * n
+    assert provider.calls == 1
+    assert llm_service.LLM_STATS == {"requests": n, "executed": 1, "coalesced": n - 1}
+    assert llm_service._INFLIGHT == {}
+    # each waiter gets its own copy, so one caller mutating it cannot affect the others
+    assert len({id(r) for r in results}) == n
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call(provider):
+    async def scenario():
+        first = asyncio.create_task(get_llm_explanation(**ARGS))
+        second = asyncio.create_task(get_llm_explanation(**ARGS))
+        await asyncio.sleep(0)
+        first.cancel()  # e.g. the client that started the call disconnected
+        await asyncio.sleep(0)
+        provider.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == EXPLANATION
+    assert provider.calls == 1
+    assert provider.cancelled == 0
+    assert llm_service._INFLIGHT == {}
+
+
+def test_all_waiters_cancelled_still_cleans_up(provider):
+    async def scenario():
+        tasks = [asyncio.create_task(get_llm_explanation(**ARGS)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        shared = next(iter(llm_service._INFLIGHT.values()))
+        provider.release.set()
+        await shared
+
+    asyncio.run(scenario())
+    assert provider.cancelled == 0
+    assert llm_service._INFLIGHT == {}
+
+
+def test_provider_error_reaches_every_waiter_and_is_not_cached(provider):
+    async def scenario():
+        tasks = [asyncio.create_task(get_llm_explanation(**ARGS)) for _ in range(3)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        assert llm_service._INFLIGHT == {}
+        # the next identical call starts a fresh provider call
+        provider.error = None
+        provider.release = asyncio.Event()
+        provider.release.set()
+        return outcomes, await get_llm_explanation(**ARGS)
+
+    provider.error = RuntimeError("provider down")
+    outcomes, retry = asyncio.run(scenario())
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert retry == EXPLANATION
+    assert provider.calls == 2
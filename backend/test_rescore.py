@@ -0,0 +1,134 @@
+import copy
+import json
+
+import pytest
+
+import rescore
+from archive import append_results, iter_archive
+from main import DEMO_VARIANTS, _build_result
+from predictor import predict_drug_risk
+from rescore import affected_offsets, current_tables, diff_tables, load_index, record_keys
+
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+EXPLANATION = {"summary": "s", "mechanism": "m", "clinical_impact": "c"}
+
+CYP2D6_IM = [v for v in DEMO_VARIANTS if v["id"] == "rs3892097"]
+CYP2C9_IM = [v for v in DEMO_VARIANTS if v["id"] == "rs1057910"]
+
+# patient → (drug, variants): exact CYP2D6 match, CYP2D6 default, exact CYP2C9 match, CYP2C19 default
+COHORT = {
+    "P_CODEINE_IM": ("CODEINE", CYP2D6_IM),
+    "P_CODEINE_DEFAULT": ("CODEINE", []),
+    "P_WARFARIN_IM": ("WARFARIN", CYP2C9_IM),
+    "P_CLOPIDOGREL_DEFAULT": ("CLOPIDOGREL", []),
+}
+
+
+def _append(path: str, patients) -> None:
+    results, exact_matches = [], []
+    for pid in patients:
+        drug, variants = COHORT[pid]
+        prediction = predict_drug_risk(drug, variants)
+        results.append(_build_result(pid, drug, TIMESTAMP, prediction, EXPLANATION, True))
+        exact_matches.append(prediction["_exact_match"])
+    append_results(results, exact_matches, path=path)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    _append(path, COHORT)
+    return path
+
+
+def _offsets(path: str) -> dict:
+    return {record["patient_id"]: offset for offset, record in iter_archive(path)}
+
+
+def _rescore(path: str, edit):
+    old = copy.deepcopy(current_tables())
+    new = copy.deepcopy(old)
+    edit(new)
+    index = load_index(path)
+    offsets = affected_offsets(index, diff_tables(old, new))
+    changes, summary = rescore.rescore(path, old, new)
+    assert summary["records_reevaluated"] == len(offsets)
+    return offsets, changes
+
+
+def test_rule_change_reevaluates_only_matching_rule(archive):
+    def edit(tables):
+        tables["DRUG_RISK_RULES"]["CODEINE"]["CYP2D6"]["IM"] = {"risk": "Toxic", "severity": "high"}
+
+    offsets, changes = _rescore(archive, edit)
+    assert offsets == [_offsets(archive)["P_CODEINE_IM"]]
+    assert [(c["patient_id"], c["after"]["risk_label"]) for c in changes] == [("P_CODEINE_IM", "Toxic")]
+
+
+def test_risk_variant_change_reevaluates_only_carriers(archive):
+    def edit(tables):
+        tables["GENE_PHENOTYPE_MAP"]["CYP2C9"]["risk_variants"]["rs1057910"] = ("*3/*3", "PM")
+
+    offsets, changes = _rescore(archive, edit)
+    assert offsets == [_offsets(archive)["P_WARFARIN_IM"]]
+    assert [(c["patient_id"], c["after"]["diplotype"], c["after"]["risk_label"]) for c in changes] == [
+        ("P_WARFARIN_IM", "*3/*3", "Adjust Dosage"),
+    ]
+
+
+def test_default_change_skips_exact_matches(archive):
+    def edit(tables):
+        tables["GENE_PHENOTYPE_MAP"]["CYP2D6"]["default"] = ("*1/*1", "IM")
+
+    offsets, changes = _rescore(archive, edit)
+    assert offsets == [_offsets(archive)["P_CODEINE_DEFAULT"]]
+    assert [(c["patient_id"], c["after"]["risk_label"]) for c in changes] == [("P_CODEINE_DEFAULT", "Adjust Dosage")]
+
+
+def test_default_key_only_for_default_scored_records(archive):
+    keys = {r["patient_id"]: record_keys(r) for _, r in iter_archive(archive)}
+    assert ("default", "CYP2D6") not in keys["P_CODEINE_IM"]
+    assert ("default", "CYP2D6") in keys["P_CODEINE_DEFAULT"]
+    # records archived before the flag existed conservatively keep the default key
+    legacy = {k: v for k, v in next(iter_archive(archive))[1].items() if k != "_exact_match"}
+    assert ("default", "CYP2D6") in record_keys(legacy)
+
+
+def test_index_extends_incrementally_after_append(archive, monkeypatch):
+    first = load_index(archive)
+    indexed_until = first["indexed_until"]
+    _append(archive, ["P_CODEINE_DEFAULT"])
+
+    reads = []
+    real_iter = rescore.iter_archive
+
+    def tracking_iter(path, start, end):
+        reads.append(start)
+        return real_iter(path, start, end)
+
+    monkeypatch.setattr(rescore, "iter_archive", tracking_iter)
+    second = load_index(archive)
+
+    assert reads == [indexed_until]  # only the appended line was read
+    new_offset = max(offset for offset, _ in iter_archive(archive))
+    assert new_offset == indexed_until
+    assert second["keys"]["default|CYP2D6"] == first["keys"]["default|CYP2D6"] + [new_offset]
+    with open(archive + ".idx.json") as f:
+        assert json.load(f)["indexed_until"] == second["indexed_until"]
+
+    reads.clear()
+    load_index(archive)
+    assert reads == []  # nothing new to index
+
+
+def test_index_resets_when_archive_is_truncated(archive):
+    load_index(archive)
+    with open(archive, "w"):
+        pass
+    _append(archive, ["P_WARFARIN_IM"])
+
+    index = load_index(archive)
+    offsets = {o for offsets in index["keys"].values() for o in offsets}
+    assert offsets == {0}
+    assert "rule|CODEINE|CYP2D6|IM" not in index["keys"]
+    assert index["keys"]["variant|CYP2C9|rs1057910"] == [0]
@@ -0,0 +1,98 @@
+import os
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import llm_service
+import responses
+from main import SUPPORTED_DRUGS, app
+from responses import accepted_encodings, add_compression
+from schemas import AnalysisResult, MultiDrugResult
+
+with open(os.path.join(os.path.dirname(__file__), "test_sample.vcf"), "rb") as f:
+    SAMPLE_VCF = f.read()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Deterministic fallback explanations, no provider calls
+    monkeypatch.setattr(llm_service, "OPENAI_API_KEY", "")
+    monkeypatch.setattr(llm_service, "GEMINI_API_KEY", "")
+    with TestClient(app) as c:
+        yield c
+
+
+def _assert_matches(model, body: dict) -> None:
+    # Round-tripping through the model must reproduce the body exactly: no missing, extra or mistyped fields
+    assert model.model_validate(body).model_dump() == body
+
+
+def test_analyze_single_drug_matches_analysis_result(client):
+    r = client.post("/analyze", files={"file": ("sample.vcf", SAMPLE_VCF)}, data={"drugs": "CODEINE"})
+    assert r.status_code == 200
+    _assert_matches(AnalysisResult, r.json())
+
+
+def test_analyze_multi_drug_matches_multi_drug_result(client):
+    r = client.post("/analyze", files={"file": ("sample.vcf", SAMPLE_VCF)}, data={"drugs": "CODEINE,WARFARIN,SIMVASTATIN"})
+    assert r.status_code == 200
+    _assert_matches(MultiDrugResult, r.json())
+
+
+def test_analyze_demo_matches_multi_drug_result(client):
+    r = client.post("/analyze/demo", data={"drugs": ",".join(SUPPORTED_DRUGS)})
+    assert r.status_code == 200
+    _assert_matches(MultiDrugResult, r.json())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+    ("gzip;q=0, br", {"br"}),
+    ("br;q=0.0, gzip;q=0.5", {"gzip"}),
+    ("GZIP ; Q=1", {"gzip"}),
+    ("identity", {"identity"}),
+    ("", set()),
+])
+def test_accepted_encodings_honours_q_zero(header, expected):
+    assert accepted_encodings(header) == expected
+
+
+def _compressed_app(mode: str) -> TestClient:
+    small = FastAPI()
+
+    @small.get("/big")
+    async def big():
+        return {"data": "x" * 4096}
+
+    add_compression(small, mode, minimum_size=100)
+    return TestClient(small)
+
+
+@pytest.mark.parametrize("accept, encoding", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+])
+def test_gzip_negotiation(accept, encoding):
+    r = _compressed_app("gzip").get("/big", headers={"Accept-Encoding": accept})
+    assert r.headers.get("content-encoding") == encoding
+    assert r.json() == {"data": "x" * 4096}
+
+
+@pytest.mark.skipif(responses.brotli is not None, reason="brotli is installed")
+def test_br_without_brotli_warns_and_falls_back_to_gzip():
+    with pytest.warns(UserWarning, match="brotli"):
+        client = _compressed_app("br")
+    assert client.get("/big", headers={"Accept-Encoding": "br, gzip"}).headers.get("content-encoding") == "gzip"
+
+
+@pytest.mark.skipif(responses.brotli is None, reason="brotli not installed")
+def test_auto_prefers_brotli():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        client = _compressed_app("auto")
+    assert client.get("/big", headers={"Accept-Encoding": "gzip, br"}).headers.get("content-encoding") == "br"
+    assert client.get("/big", headers={"Accept-Encoding": "gzip, br;q=0"}).headers.get("content-encoding") == "gzip"